@@ -3,6 +3,7 @@
 import os
 import sys
 import subprocess # Added for git operations
+import replay # Record/replay of external calls, see replay.py
 
 # Define paths and URLs for local files and remote configuration.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # Ensure BASE_DIR is absolute
@@ -14,7 +15,7 @@ KEYWORDS_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTWCrmL5uXBJ
 OVERRIDES_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTWCrmL5uXBJ9_pORfhESiZyzD3Yw9ci0Y-fQfv0WATRDq6T8dX0E7yz1XNfA6f92R7FDmK40MFSdH4/pub?gid=1760236101&single=true&output=csv"
 
 # Prevent concurrent runs using a lockfile
-LOCKFILE = os.path.join(BASE_DIR, "newsbot.lock")
+LOCKFILE = replay.run_path(os.path.join(BASE_DIR, "newsbot.lock"))
 if os.path.exists(LOCKFILE):
     print("Script is already running. Exiting.")
     sys.exit()
@@ -32,25 +33,27 @@ import random
 import json
 import re
 import ast
+import hashlib
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qsl, urlencode
 from email.message import EmailMessage
 import xml.etree.ElementTree as ET
 import requests
 from zoneinfo import ZoneInfo
 from email.utils import parsedate_to_datetime
-from nltk.stem import PorterStemmer, WordNetLemmatizer
 from dotenv import load_dotenv # Keep this early
 import google.generativeai as genai
 from google.generativeai.types import FunctionDeclaration, Tool # Added
 from proto.marshal.collections.repeated import RepeatedComposite # Added
 from proto.marshal.collections.maps import MapComposite # Added
+from textnorm import normalize, normalize_texts, available_cpus, shutdown_pool
 
 
 # Load environment variables from .env file FIRST.
 load_dotenv()
 
 # Initialize logging immediately to capture all runtime info
-log_path = os.path.join(BASE_DIR, "logs/newsbot.log")
+log_path = replay.run_path(os.path.join(BASE_DIR, "logs/newsbot.log"))
 os.makedirs(os.path.dirname(log_path), exist_ok=True)
 logging.basicConfig(
     filename=log_path,
@@ -59,10 +62,13 @@ logging.basicConfig(
 )
 logging.info(f"Script started at {datetime.now()}")
 
-# Initialize NLP tools.
-stemmer = PorterStemmer()
-lemmatizer = WordNetLemmatizer()
-
+# Record or replay external calls when NEWSBOT_FIXTURE_MODE is set (see replay.py)
+try:
+    replay.activate()
+except Exception as e:
+    logging.critical(f"Fatal: Unable to activate fixture mode '{replay.MODE}' with bundle {replay.BUNDLE_DIR}: {e}. Exiting.")
+    if os.path.exists(LOCKFILE): os.remove(LOCKFILE)
+    sys.exit(1)
 
 # Download nltk resources
 from nltk.data import find
@@ -130,12 +136,15 @@ MATCH_THRESHOLD = float(CONFIG.get("DEDUPLICATION_MATCH_THRESHOLD", 0.4))
 GEMINI_MODEL_NAME = CONFIG.get("DIGEST_GEMINI_MODEL_NAME", "gemini-2.5-flash-lite") 
 MAX_CANDIDATES_FOR_LLM = int(CONFIG.get("MAX_CANDIDATES_FOR_LLM", 150))
 BATCH_SIZE = 10 # Consolidated fetching size
+NORMALIZE_POOL_MIN_BATCH = int(CONFIG.get("NORMALIZE_POOL_MIN_BATCH", 2000)) # Smaller batches stay in-process
+NORMALIZE_POOL_WORKERS = int(CONFIG.get("NORMALIZE_POOL_WORKERS", available_cpus()))
 
 USER_TIMEZONE = CONFIG.get("TIMEZONE", "America/New_York")
 try:
     ZONE = ZoneInfo(USER_TIMEZONE)
 except Exception:
     ZONE = ZoneInfo("America/New_York")
+UTC = ZoneInfo("UTC")
 
 def load_csv_weights(url):
     weights = {}
@@ -171,23 +180,125 @@ if None in (TOPIC_WEIGHTS, KEYWORD_WEIGHTS, OVERRIDES):
     if os.path.exists(LOCKFILE): os.remove(LOCKFILE)
     sys.exit(1)
 
-def normalize(text):
-    words = re.findall(r'\b\w+\b', text.lower())
-    stemmed = [stemmer.stem(w) for w in words]
-    lemmatized = [lemmatizer.lemmatize(w) for w in stemmed]
-    return " ".join(lemmatized)
-
-def is_in_history(article_title: str, history: dict, threshold: float) -> bool:
-    norm_title_tokens = set(normalize(article_title).split())
-    if not norm_title_tokens: return False
-    for articles_in_topic in history.values():
-        for past_article_data in articles_in_topic:
-            past_tokens = set(normalize(past_article_data.get("title", "")).split())
-            if not past_tokens: continue
-            intersection_len = len(norm_title_tokens.intersection(past_tokens))
-            union_len = len(norm_title_tokens.union(past_tokens))
-            if union_len == 0: continue
-            if (intersection_len / union_len) >= threshold: return True
+def _normalize_texts(texts):
+    """Batch normalization, pooled across processes per NORMALIZE_POOL_* (see textnorm.normalize_texts)."""
+    return normalize_texts(texts, NORMALIZE_POOL_MIN_BATCH, NORMALIZE_POOL_WORKERS)
+
+def parse_pub_epoch(pub_date):
+    """Parses an RFC 2822 pubDate into a UTC epoch, or None if unparsable."""
+    try: return parsedate_to_datetime(pub_date).astimezone(UTC).timestamp()
+    except: return None
+
+class Article:
+    """Compact article record: pubDate is parsed on construction, the title normalized once on first use."""
+    __slots__ = ("title", "link", "pubDate", "epoch", "_norm", "_tokens", "topic")
+
+    def __init__(self, title, link=None, pubDate="", topic=None):
+        self.title = title
+        self.link = link
+        self.pubDate = pubDate
+        self.epoch = parse_pub_epoch(pubDate)
+        self._norm = None
+        self._tokens = None
+        self.topic = sys.intern(topic) if topic else None
+
+    @property
+    def norm(self):
+        if self._norm is None: self._norm = normalize(self.title)
+        return self._norm
+
+    @property
+    def tokens(self):
+        if self._tokens is None: self._tokens = frozenset(self.norm.split())
+        return self._tokens
+
+    @staticmethod
+    def normalize_all(articles):
+        """Fills in normalized titles for many records with one batch call."""
+        pending = [a for a in articles if a._norm is None]
+        for article, norm in zip(pending, _normalize_texts(a.title for a in pending)):
+            article._norm = norm
+
+    @classmethod
+    def from_dict(cls, data, topic=None):
+        link = data.get("link")
+        return cls(str(data.get("title") or ""), str(link) if link else None, str(data.get("pubDate") or ""), topic)
+
+    def to_dict(self):
+        data = {"title": self.title, "pubDate": self.pubDate}
+        if self.link is not None: data["link"] = self.link
+        return data
+
+TRACKING_PARAMS = {"oc", "fbclid", "gclid", "mc_cid", "mc_eid"} # plus any utm_* parameter
+
+def canonical_link(link):
+    """Drops scheme, fragment and tracking parameters so redirect variants of the same URL compare equal.
+
+    Google News article links carry the story ID in the path, so their whole query is dropped;
+    other hosts keep non-tracking parameters, which may be the article ID (?p=123).
+    """
+    if not link: return ""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    query = ""
+    if host != "news.google.com":
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                  if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+        query = urlencode(sorted(params))
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+def title_key(title):
+    """Cheap lowercase/punctuation-free form of a title, without stemming or lemmatizing."""
+    return " ".join(re.findall(r'\b\w+\b', title.lower()))
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+class ExactDuplicateFilter:
+    """O(1)-per-article pre-filter on canonical link and title digests, covering this run and history."""
+
+    def __init__(self, history_records=()):
+        self.history_titles = {_digest(k) for k in (title_key(a.title) for a in history_records) if k}
+        # Only history entries written since links were stored (Article.to_dict) carry one
+        self.history_links = {_digest(k) for k in (canonical_link(a.link) for a in history_records) if k}
+        self.seen_titles, self.seen_links = set(), set()
+        self.counts = {"history_link": 0, "history_title": 0, "link": 0, "title": 0}
+
+    def is_duplicate(self, article) -> bool:
+        key, link = title_key(article.title), canonical_link(article.link)
+        title_digest = _digest(key) if key else None
+        link_digest = _digest(link) if link else None
+        if link_digest in self.history_links:
+            self.counts["history_link"] += 1; return True
+        if title_digest in self.history_titles:
+            self.counts["history_title"] += 1; return True
+        if link_digest in self.seen_links:
+            self.counts["link"] += 1; return True
+        if title_digest in self.seen_titles:
+            self.counts["title"] += 1; return True
+        if title_digest is not None: self.seen_titles.add(title_digest)
+        if link_digest is not None: self.seen_links.add(link_digest)
+        return False
+
+    @property
+    def removed(self):
+        return sum(self.counts.values())
+
+def load_history_records(history: dict) -> list:
+    """Converts the history JSON into Article records so titles are normalized once per run."""
+    records = [Article.from_dict(a, topic) for topic, articles in history.items() for a in articles]
+    Article.normalize_all(records)
+    return records
+
+def is_in_history(title_tokens: frozenset, history_records: list, threshold: float) -> bool:
+    if not title_tokens: return False
+    for past_article in history_records:
+        past_tokens = past_article.tokens
+        if not past_tokens: continue
+        intersection_len = len(title_tokens & past_tokens)
+        union_len = len(title_tokens | past_tokens)
+        if union_len == 0: continue
+        if (intersection_len / union_len) >= threshold: return True
     return False
 
 def to_user_timezone(dt):
@@ -211,35 +322,27 @@ def fetch_articles_for_batch(topics_batch, max_articles=20):
                 time.sleep((attempt + 1) * 7); continue
             response.raise_for_status()
             root = ET.fromstring(response.content)
-            time_cutoff_utc = datetime.now(ZoneInfo("UTC")) - timedelta(hours=MAX_ARTICLE_HOURS)
+            time_cutoff_epoch = (replay.now(UTC) - timedelta(hours=MAX_ARTICLE_HOURS)).timestamp()
             articles = []
             for item in root.findall("./channel/item"):
                 title = item.find("title").text.strip()
                 link = item.find("link").text
                 pubDate_text = item.find("pubDate").text
-                try:
-                    pub_dt = parsedate_to_datetime(pubDate_text).astimezone(ZoneInfo("UTC"))
-                    if pub_dt > time_cutoff_utc: articles.append({"title": title, "link": link, "pubDate": pubDate_text})
-                except: continue
+                article = Article(title, link, pubDate_text)
+                if article.epoch is not None and article.epoch > time_cutoff_epoch: articles.append(article)
             return articles
         except Exception as e:
             if attempt == 2: logging.error(f"Batch fetch failed: {e}")
             time.sleep(2)
     return []
 
-def load_recent_headlines_from_history(history_data: dict, max_headlines: int) -> list:
-    if not history_data: return []
-    all_articles = []
-    for topic_articles in history_data.values(): all_articles.extend(topic_articles)
-    def get_date_key(article):
-        try: return parsedate_to_datetime(article.get("pubDate", "")).astimezone(ZoneInfo("UTC"))
-        except: return datetime.min.replace(tzinfo=ZoneInfo("UTC"))
-    all_articles.sort(key=get_date_key, reverse=True)
-    return [article['title'] for article in all_articles[:max_headlines]]
-
-def contains_banned_keyword(text, banned_terms):
-    if not text: return False
-    norm_text = normalize(text)
+def load_recent_headlines_from_history(history_records: list, max_headlines: int) -> list:
+    if not history_records: return []
+    ordered = sorted(history_records, key=lambda a: a.epoch if a.epoch is not None else float("-inf"), reverse=True)
+    return [article.title for article in ordered[:max_headlines]]
+
+def contains_banned_keyword(norm_text, banned_terms):
+    if not norm_text: return False
     return any(banned_term in norm_text for banned_term in banned_terms if banned_term)
 
 # --- Tool Definition & LLM Logic ---
@@ -275,6 +378,21 @@ SELECT_DIGEST_ARTICLES_TOOL = Tool(
     ]
 )
 
+def _to_plain(value):
+    """Converts proto-plus Struct wrappers (MapComposite/RepeatedComposite) into plain dicts and lists."""
+    if isinstance(value, (MapComposite, dict)): return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (RepeatedComposite, list, tuple)): return [_to_plain(v) for v in value]
+    return value
+
+def _digest_selection_args(response):
+    """Returns the format_digest_selection call's args as plain JSON data, or None if the model made no call."""
+    if response.candidates and response.candidates[0].content.parts:
+        for part in response.candidates[0].content.parts:
+            if hasattr(part, 'function_call') and part.function_call:
+                # Extract args safely from google.generativeai response wrapper
+                return _to_plain(part.function_call.args)
+    return None
+
 def prioritize_with_gemini(candidates_to_send: list, digest_history: list, gemini_api_key: str, topic_weights: dict, keyword_weights: dict, overrides: dict) -> list:
     genai.configure(api_key=gemini_api_key)
     model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME, tools=[SELECT_DIGEST_ARTICLES_TOOL])
@@ -311,36 +429,37 @@ def prioritize_with_gemini(candidates_to_send: list, digest_history: list, gemin
         "You must populate the mandatory `importance_rank` for every topic and return the unique `id` of each selected article."
     )
 
+    def generate_selection_args():
+        response = model.generate_content([prompt], tool_config={"function_calling_config": {"mode": "ANY", "allowed_function_names": ["format_digest_selection"]}})
+        return _digest_selection_args(response)
+
     for attempt in range(3):
         try:
-            response = model.generate_content([prompt], tool_config={"function_calling_config": {"mode": "ANY", "allowed_function_names": ["format_digest_selection"]}})
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, 'function_call') and part.function_call:
-                        # Extract args safely from google.generativeai response wrapper
-                        args = part.function_call.args
-                        try:
-                            entries = args["selected_digest_entries"]
-                        except Exception:
-                            entries = getattr(args, "selected_digest_entries", [])
-                        
-                        ranked_results = []
-                        for entry in entries:
-                            try:
-                                topic = entry["topic_name"]
-                                rank = entry.get("importance_rank", 99)
-                                article_ids = [str(aid) for aid in entry.get("selected_article_ids", [])]
-                            except Exception:
-                                # Fallback if items are mapping properties rather than dict keys
-                                topic = getattr(entry, "topic_name", None)
-                                rank = getattr(entry, "importance_rank", 99)
-                                article_ids = [str(aid) for aid in getattr(entry, "selected_article_ids", [])]
-
-                            if topic and article_ids: 
-                                ranked_results.append((int(rank), topic.strip(), article_ids))
-                        
-                        ranked_results.sort()
-                        return ranked_results
+            # Recorded/replayed at the tool-call boundary, so prompt building and parsing always run
+            args = replay.llm("digest", generate_selection_args)
+            if args is not None:
+                try:
+                    entries = args["selected_digest_entries"]
+                except Exception:
+                    entries = getattr(args, "selected_digest_entries", [])
+                
+                ranked_results = []
+                for entry in entries:
+                    try:
+                        topic = entry["topic_name"]
+                        rank = entry.get("importance_rank", 99)
+                        article_ids = [str(aid) for aid in entry.get("selected_article_ids", [])]
+                    except Exception:
+                        # Fallback if items are mapping properties rather than dict keys
+                        topic = getattr(entry, "topic_name", None)
+                        rank = getattr(entry, "importance_rank", 99)
+                        article_ids = [str(aid) for aid in getattr(entry, "selected_article_ids", [])]
+
+                    if topic and article_ids: 
+                        ranked_results.append((int(rank), sys.intern(topic.strip()), article_ids))
+                
+                ranked_results.sort()
+                return ranked_results
             return []
         except Exception as e:
             if "503" in str(e) and attempt < 2:
@@ -360,66 +479,73 @@ def git_push_history_json(history_file_path, base_dir, zone_for_commit_msg):
 
 def main():
     history = {}
-    if os.path.exists(HISTORY_FILE):
+    history_file = replay.data_file(HISTORY_FILE)
+    if os.path.exists(history_file):
         try:
-            with open(HISTORY_FILE, "r") as f: history = json.load(f)
+            with open(history_file, "r") as f: history = json.load(f)
         except: history = {}
 
-    MAX_HISTORY_HEADLINES_FOR_LLM = int(CONFIG.get("MAX_HISTORY_HEADLINES_FOR_LLM", 150))
-    recent_headlines_for_llm = load_recent_headlines_from_history(history, MAX_HISTORY_HEADLINES_FOR_LLM)
-
     try:
+        history_records = load_history_records(history)
+        MAX_HISTORY_HEADLINES_FOR_LLM = int(CONFIG.get("MAX_HISTORY_HEADLINES_FOR_LLM", 150))
+        recent_headlines_for_llm = load_recent_headlines_from_history(history_records, MAX_HISTORY_HEADLINES_FOR_LLM)
+
         gemini_api_key = os.getenv("GEMINI_API_KEY")
         banned_terms = [k for k, v in OVERRIDES.items() if v == "ban"]
         fetch_limit = int(CONFIG.get("ARTICLES_TO_FETCH_PER_TOPIC", 20))
 
         # --- BATCHED FETCHING STAGE ---
-        topic_keys = list(TOPIC_WEIGHTS.keys())
+        topic_keys = [sys.intern(t) for t in TOPIC_WEIGHTS.keys()]
         random.shuffle(topic_keys)
+        norm_topics = dict(zip(topic_keys, _normalize_texts(topic_keys)))
         batches = [topic_keys[i:i + BATCH_SIZE] for i in range(0, len(topic_keys), BATCH_SIZE)]
 
         logging.info(f"--- Starting Batched Article Fetching ({len(batches)} batches) ---")
         
-        candidates_for_gemini = []
-        id_to_article_map = {}
-        article_counter = 0
+        fetched = [] # (batch, article) pairs that survive the exact-duplicate filter
+        exact_dupes = ExactDuplicateFilter(history_records)
 
         for batch in batches:
             articles_for_batch = fetch_articles_for_batch(batch, fetch_limit)
             time.sleep(random.uniform(1.5, 3.0)) 
 
             for article in articles_for_batch:
-                title, norm_art_title = article['title'], normalize(article['title'])
-                
-                # Check history & bans
-                if is_in_history(title, history, MATCH_THRESHOLD) or contains_banned_keyword(title, banned_terms): continue
-                
-                # Robust Attribution Logic
-                best_topic, highest_w = None, -1
-                for topic in batch:
-                    norm_topic = normalize(topic)
-                    if norm_topic in norm_art_title or any(word in norm_art_title for word in norm_topic.split() if len(word) > 3):
-                        weight = TOPIC_WEIGHTS.get(topic, 0)
-                        if weight > highest_w: highest_w, best_topic = weight, topic
-                
-                if not best_topic: best_topic = max(batch, key=lambda t: TOPIC_WEIGHTS.get(t, 0))
-                
-                # Assign ID for exact prompt logic
-                aid = f"art_{article_counter:03d}"
-                candidates_for_gemini.append({
-                    "id": aid, 
-                    "topic": best_topic, 
-                    "title": title
-                })
-                id_to_article_map[aid] = article
-                article_counter += 1
-
-        if not candidates_for_gemini: 
+                # Exact repeats across overlapping batches or already in history
+                if not exact_dupes.is_duplicate(article): fetched.append((batch, article))
+
+        logging.info(f"Exact-duplicate filter removed {exact_dupes.removed} articles "
+                     f"(history link: {exact_dupes.counts['history_link']}, history title: {exact_dupes.counts['history_title']}, "
+                     f"link: {exact_dupes.counts['link']}, title: {exact_dupes.counts['title']})")
+
+        # Normalize all distinct titles in one batch so large runs can use every core
+        Article.normalize_all([article for _, article in fetched])
+
+        candidate_articles = []
+        for batch, article in fetched:
+            norm_art_title = article.norm
+            
+            # Check history & bans
+            if is_in_history(article.tokens, history_records, MATCH_THRESHOLD) or contains_banned_keyword(norm_art_title, banned_terms): continue
+            
+            # Robust Attribution Logic
+            best_topic, highest_w = None, -1
+            for topic in batch:
+                norm_topic = norm_topics[topic]
+                if norm_topic in norm_art_title or any(word in norm_art_title for word in norm_topic.split() if len(word) > 3):
+                    weight = TOPIC_WEIGHTS.get(topic, 0)
+                    if weight > highest_w: highest_w, best_topic = weight, topic
+            
+            if not best_topic: best_topic = max(batch, key=lambda t: TOPIC_WEIGHTS.get(t, 0))
+            article.topic = best_topic
+            candidate_articles.append(article)
+
+        if not candidate_articles: 
             logging.info("No candidates generated. Exiting.")
             return
 
-        # Cap candidates to prevent massive token usage
-        candidates_for_gemini = candidates_for_gemini[:MAX_CANDIDATES_FOR_LLM]
+        # Cap candidates to prevent massive token usage, then assign IDs for exact prompt logic
+        id_to_article_map = {f"art_{i:03d}": article for i, article in enumerate(candidate_articles[:MAX_CANDIDATES_FOR_LLM])}
+        candidates_for_gemini = [{"id": aid, "topic": a.topic, "title": a.title} for aid, a in id_to_article_map.items()]
         
         # --- GEMINI PRIORITIZATION ---
         ranked_topics_from_gemini = prioritize_with_gemini(
@@ -452,13 +578,13 @@ def main():
             # Reduced margin-bottom to bring the headline closer to the topic line
             section = f'<h3 style="margin-top: 20px; margin-bottom: 4px;">{html.escape(topic)}</h3>'
             for art in articles:
-                date_str = to_user_timezone(parsedate_to_datetime(art["pubDate"])).strftime("%a, %d %b %Y %I:%M %p")
+                date_str = to_user_timezone(datetime.fromtimestamp(art.epoch, UTC)).strftime("%a, %d %b %Y %I:%M %p")
                 # Reduced margin-top on the paragraph to match
-                section += f'<p style="margin-top: 4px; margin-bottom: 12px;">📰 <a href="{art["link"]}">{html.escape(art["title"])}</a><br><small>📅 {date_str}</small></p>'
+                section += f'<p style="margin-top: 4px; margin-bottom: 12px;">📰 <a href="{art.link}">{html.escape(art.title)}</a><br><small>📅 {date_str}</small></p>'
             html_body_parts.append(section)
         
         msg = EmailMessage()
-        msg["Subject"] = f"🗞️ News Digest – {datetime.now(ZONE).strftime('%Y-%m-%d %I:%M %p')}"
+        msg["Subject"] = f"🗞️ News Digest – {replay.now(ZONE).strftime('%Y-%m-%d %I:%M %p')}"
         msg["From"], msg["To"], msg["Bcc"] = EMAIL_FROM, EMAIL_FROM, ", ".join(EMAIL_BCC)
         msg.add_alternative(f"<html><body>{''.join(html_body_parts)}</body></html>", subtype="html")
 
@@ -466,14 +592,15 @@ def main():
             server.starttls(); server.login(EMAIL_FROM, EMAIL_PASS); server.send_message(msg)
         
         for topic, articles_sent in final_digest_to_email.items():
-            history.setdefault(topic, []).extend([{"title": a["title"], "pubDate": a["pubDate"]} for a in articles_sent])
+            history.setdefault(topic, []).extend([a.to_dict() for a in articles_sent])
             history[topic] = history[topic][-40:]
 
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f: json.dump(history, f, indent=2)
-        if CONFIG.get("ENABLE_GIT_PUSH", False): git_push_history_json(HISTORY_FILE, BASE_DIR, ZONE)
+        with open(history_file, "w", encoding="utf-8") as f: json.dump(history, f, indent=2)
+        if CONFIG.get("ENABLE_GIT_PUSH", False): git_push_history_json(history_file, BASE_DIR, ZONE)
 
     except Exception as e: logging.critical(f"Main Error: {e}", exc_info=True)
     finally:
+        shutdown_pool()
         if os.path.exists(LOCKFILE): os.remove(LOCKFILE)
         logging.info(f"Script finished at {datetime.now(ZONE)}")
              
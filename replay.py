@@ -0,0 +1,171 @@
+# Author: Blake Rayvid <https://github.com/brayvid/newsbot>
+#
+# Record/replay of external calls so a production run can be reproduced and
+# profiled offline. Controlled by two environment variables:
+#
+#   NEWSBOT_FIXTURE_MODE=record|replay
+#   NEWSBOT_FIXTURE=/path/to/bundle
+#
+# A bundle is a directory that newsbot.py and summary.py can share. Per script
+# it holds <script>.json (HTTP responses, LLM outputs, branch decisions, clock
+# and random seed), files/<script>/ (input file snapshots) and
+# outbox/<script>-NNN.eml (emails). Replay runs keep their data files, lockfile,
+# log and emails under <bundle>/replay/, so they neither touch the repo's files
+# nor block a scheduled production run.
+
+import os
+import sys
+import json
+import base64
+import random
+import shutil
+import logging
+import atexit
+import smtplib
+import subprocess
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import requests
+
+MODE = os.getenv("NEWSBOT_FIXTURE_MODE", "").strip().lower() or None
+BUNDLE_DIR = os.path.abspath(os.getenv("NEWSBOT_FIXTURE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")))
+SCRIPT = os.path.splitext(os.path.basename(sys.argv[0]))[0] or "newsbot"
+FIXTURE_FILE = os.path.join(BUNDLE_DIR, f"{SCRIPT}.json")
+
+_fixture = {"started_at": None, "seed": None, "http": {}, "llm": {}, "values": {}}
+_originals = {}
+_outbox_counter = 0
+
+def _save():
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    with open(FIXTURE_FILE, "w", encoding="utf-8") as f:
+        json.dump(_fixture, f, indent=2, ensure_ascii=False)
+    logging.info(f"Fixture bundle saved to {BUNDLE_DIR}")
+
+def _write_outbox(msg):
+    global _outbox_counter
+    outbox = os.path.join(BUNDLE_DIR, "replay" if MODE == "replay" else "", "outbox")
+    os.makedirs(outbox, exist_ok=True)
+    _outbox_counter += 1
+    with open(os.path.join(outbox, f"{SCRIPT}-{_outbox_counter:03d}.eml"), "wb") as f:
+        f.write(bytes(msg))
+
+def _recording_get(url, *args, **kwargs):
+    entries = _fixture["http"].setdefault(url, [])
+    try:
+        response = _originals["requests.get"](url, *args, **kwargs)
+    except Exception as e:
+        entries.append({"error": str(e)})
+        raise
+    entries.append({"status_code": response.status_code, "content": base64.b64encode(response.content).decode("ascii")})
+    return response
+
+def _replaying_get(url, *args, **kwargs):
+    entries = _fixture["http"].get(url)
+    if not entries:
+        raise requests.ConnectionError(f"No recorded response for {url}")
+    entry = entries.pop(0)
+    if "error" in entry:
+        raise requests.RequestException(entry["error"])
+    response = requests.Response()
+    response.status_code = entry["status_code"]
+    response._content = base64.b64decode(entry["content"])
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+class _ReplaySMTP:
+    """Stands in for smtplib.SMTP during replay; messages go to the replay outbox."""
+    def __init__(self, *args, **kwargs): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def starttls(self, *args, **kwargs): pass
+    def login(self, *args, **kwargs): pass
+    def send_message(self, msg, *args, **kwargs): _write_outbox(msg)
+
+def _recording_send_message(self, msg, *args, **kwargs):
+    result = _originals["SMTP.send_message"](self, msg, *args, **kwargs)
+    _write_outbox(msg)
+    return result
+
+def _replaying_run(args, *pargs, **kwargs):
+    logging.info(f"Replay: skipped subprocess {args}")
+    return subprocess.CompletedProcess(args, 0, stdout=b"", stderr=b"")
+
+def activate():
+    """Installs the record or replay hooks; does nothing unless NEWSBOT_FIXTURE_MODE is set."""
+    global _fixture
+    if MODE is None or _originals: return
+    if MODE not in ("record", "replay"):
+        raise ValueError(f"Unknown NEWSBOT_FIXTURE_MODE '{MODE}' (expected 'record' or 'replay')")
+    _originals["requests.get"] = requests.get
+    if MODE == "record":
+        _fixture["started_at"] = datetime.now(ZoneInfo("UTC")).isoformat()
+        _fixture["seed"] = random.randrange(2**32)
+        requests.get = _recording_get
+        _originals["SMTP.send_message"] = smtplib.SMTP.send_message
+        smtplib.SMTP.send_message = _recording_send_message
+        atexit.register(_save)
+    else:
+        with open(FIXTURE_FILE, "r", encoding="utf-8") as f: _fixture = json.load(f)
+        requests.get = _replaying_get
+        smtplib.SMTP = _ReplaySMTP
+        subprocess.run = _replaying_run
+        time.sleep = lambda seconds: None
+    random.seed(_fixture["seed"])
+    logging.info(f"Fixture {MODE} mode active, bundle: {BUNDLE_DIR}")
+
+def now(tz=None):
+    """Current time, frozen at the recorded start while recording or replaying."""
+    if MODE is None or _fixture["started_at"] is None: return datetime.now(tz)
+    started = datetime.fromisoformat(_fixture["started_at"])
+    return started.astimezone(tz) if tz else started.astimezone().replace(tzinfo=None)
+
+def run_path(path):
+    """Returns the path for a per-run file (lockfile, log): under <bundle>/replay/ during replay."""
+    if MODE != "replay": return path
+    scratch = os.path.join(BUNDLE_DIR, "replay", SCRIPT, os.path.basename(path))
+    os.makedirs(os.path.dirname(scratch), exist_ok=True)
+    return scratch
+
+def data_file(path):
+    """Returns the path a script should use for a local data file.
+
+    Recording snapshots the file into the bundle; replay works on a fresh
+    copy of that snapshot under <bundle>/replay/.
+    """
+    if MODE is None: return path
+    snapshot = os.path.join(BUNDLE_DIR, "files", SCRIPT, os.path.basename(path))
+    if MODE == "record":
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        if os.path.exists(path): shutil.copyfile(path, snapshot)
+        return path
+    scratch = run_path(path)
+    if os.path.exists(snapshot): shutil.copyfile(snapshot, scratch)
+    elif os.path.exists(scratch): os.remove(scratch)
+    return scratch
+
+def _recorded(channel, name, call):
+    if MODE is None: return call()
+    if MODE == "record":
+        result = call()
+        _fixture[channel].setdefault(name, []).append(result)
+        return result
+    outputs = _fixture.get(channel, {}).get(name)
+    if not outputs: raise LookupError(f"No recorded {channel} entry for '{name}'")
+    return outputs.pop(0)
+
+def llm(name, call):
+    """Runs an LLM call and records its parsed output, or returns the recorded output on replay.
+
+    Calls sharing a name are matched in order. Outputs must be JSON-serializable.
+    """
+    return _recorded("llm", name, call)
+
+def value(name, current):
+    """Records a value a branch depends on (e.g. whether credentials are set) and replays it.
+
+    Keeps replay on the recorded path when the offline environment differs.
+    """
+    return _recorded("values", name, lambda: current)
@@ -13,12 +13,13 @@ import requests
 import csv
 from email.message import EmailMessage
 import smtplib
+import replay
 
 # --- START: Script-wide constants ---
 CONFIG_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTWCrmL5uXBJ9_pORfhESiZyzD3Yw9ci0Y-fQfv0WATRDq6T8dX0E7yz1XNfA6f92R7FDmK40MFSdH4/pub?gid=446667252&single=true&output=csv"
 BASE_DIR = os.path.dirname(__file__) or "."
 HISTORY_FILE = os.path.join(BASE_DIR, "history.json")
-LOGFILE = os.path.join(BASE_DIR, "logs/summary.log")
+LOGFILE = replay.run_path(os.path.join(BASE_DIR, "logs/summary.log"))
 SUMMARIES_FILE = os.path.join(BASE_DIR, "summaries.json")
 # --- END: Script-wide constants ---
 
@@ -37,6 +38,13 @@ logging.info("--- Summary script started ---")
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# --- Record or replay external calls when NEWSBOT_FIXTURE_MODE is set (see replay.py) ---
+try:
+    replay.activate()
+except Exception as e:
+    logging.critical(f"Fatal: Unable to activate fixture mode '{replay.MODE}' with bundle {replay.BUNDLE_DIR}: {e}. Exiting.")
+    sys.exit(1)
+
 # --- MODIFIED: Git Sync Function at the beginning ---
 def sync_repository():
     """Ensures the local repository is clean and up-to-date before proceeding."""
@@ -105,7 +113,7 @@ except Exception:
 
 # --- Load history ---
 try:
-    with open(HISTORY_FILE, "r") as f:
+    with open(replay.data_file(HISTORY_FILE), "r") as f:
         history_data = json.load(f)
     logging.info(f"Successfully loaded history file: {HISTORY_FILE}")
 except Exception as e:
@@ -115,7 +123,7 @@ except Exception as e:
 def filter_history_last_7_days(data):
     """Filters history, handling multiple date formats."""
     filtered_data = {}
-    now_utc = datetime.now(ZoneInfo("UTC"))
+    now_utc = replay.now(ZoneInfo("UTC"))
     seven_days_ago = now_utc - timedelta(days=7)
     for topic, articles in data.items():
         recent_articles = []
@@ -176,10 +184,9 @@ try:
     tools = [genai.types.Tool(google_search_retrieval={})]
 
     # Pass the tool in the `tools` parameter
-    result = model.generate_content(prompt, tools=tools)
+    answer = replay.llm("summary", lambda: model.generate_content(prompt, tools=tools).text.strip())
     # <<< MODIFICATION END >>>
 
-    answer = result.text.strip()
     logging.info("Gemini returned a response.")
 except Exception as e:
     logging.error(f"Gemini request failed: {e}")
@@ -191,9 +198,9 @@ formatted = answer.replace('\n', '<br>')
 EMAIL_FROM = os.getenv("GMAIL_USER", "").encode("ascii", "ignore").decode()
 EMAIL_BCC = os.getenv("MAILTO", "").strip()
 SMTP_PASS = os.getenv("GMAIL_APP_PASSWORD", "")
-if EMAIL_FROM and SMTP_PASS and EMAIL_BCC:
+if replay.value("email_configured", bool(EMAIL_FROM and SMTP_PASS and EMAIL_BCC)):
     msg = EmailMessage()
-    msg["Subject"] = f"🗞️ Week In Review – {datetime.now(ZONE).strftime('%Y-%m-%d')}"
+    msg["Subject"] = f"🗞️ Week In Review – {replay.now(ZONE).strftime('%Y-%m-%d')}"
     msg["From"] = EMAIL_FROM
     msg["To"] = EMAIL_FROM
     msg["Bcc"] = ", ".join([email.strip() for email in EMAIL_BCC.split(",") if email.strip()])
@@ -211,18 +218,19 @@ else:
     logging.warning("Email credentials not fully configured. Skipping email.")
 
 # --- Append summary to summaries.json ---
-summary_entry = {"timestamp": datetime.now(ZONE).isoformat(), "summary": formatted}
+summary_entry = {"timestamp": replay.now(ZONE).isoformat(), "summary": formatted}
+summaries_file = replay.data_file(SUMMARIES_FILE)
 try:
     summaries = []
-    if os.path.exists(SUMMARIES_FILE):
-        with open(SUMMARIES_FILE, "r", encoding="utf-8") as f:
+    if os.path.exists(summaries_file):
+        with open(summaries_file, "r", encoding="utf-8") as f:
             try:
                 summaries = json.load(f)
             except json.JSONDecodeError:
                 logging.warning("summaries.json is empty or corrupted. Starting new list.")
                 summaries = []
     summaries.append(summary_entry)
-    with open(SUMMARIES_FILE, "w", encoding="utf-8") as f:
+    with open(summaries_file, "w", encoding="utf-8") as f:
         json.dump(summaries, f, indent=2, ensure_ascii=False)
     logging.info("Summary appended to summaries.json")
 except Exception as e:
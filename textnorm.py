@@ -0,0 +1,63 @@
+# Author: Blake Rayvid <https://github.com/brayvid/newsbot>
+#
+# Headline normalization (stemming + lemmatization) for newsbot.py. Kept in an
+# importable module so process-pool workers look up `normalize` here rather
+# than on the running script's __main__, which fails under `python -m cProfile`.
+
+import os
+import re
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from nltk.stem import PorterStemmer, WordNetLemmatizer
+
+stemmer = PorterStemmer()
+lemmatizer = WordNetLemmatizer()
+_pool = None
+_pool_failed = False
+
+def available_cpus():
+    """CPUs this process may run on (respects affinity/cpusets), falling back to the host count."""
+    try: return len(os.sched_getaffinity(0))
+    except AttributeError: return os.cpu_count() or 1
+
+def normalize(text):
+    words = re.findall(r'\b\w+\b', text.lower())
+    stemmed = [stemmer.stem(w) for w in words]
+    lemmatized = [lemmatizer.lemmatize(w) for w in stemmed]
+    return " ".join(lemmatized)
+
+def _init_worker():
+    """Builds the NLTK objects once per worker process and loads WordNet up front."""
+    global stemmer, lemmatizer
+    stemmer, lemmatizer = PorterStemmer(), WordNetLemmatizer()
+    lemmatizer.lemmatize("warmup")
+
+def normalize_texts(texts, min_pool_batch, max_workers):
+    """Normalizes texts in order, across a process pool when the batch is large enough to pay for it.
+
+    The pool is created on first use and reused by later batches, so each worker's
+    initializer runs once per run; call shutdown_pool() when done.
+    """
+    global _pool, _pool_failed
+    texts = list(texts)
+    if _pool_failed or len(texts) < min_pool_batch or max_workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        return [normalize(t) for t in texts]
+    try:
+        if _pool is None:
+            # fork, so workers don't re-import the calling script (lockfile, config fetch). The first
+            # large batch comes before any Gemini request, so no grpc channels or threads exist yet.
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"),
+                                        initializer=_init_worker)
+        return list(_pool.map(normalize, texts, chunksize=max(1, len(texts) // (max_workers * 4))))
+    except Exception as e:
+        _pool_failed = True
+        logging.error(f"Process-pool normalization failed, normalizing in-process for the rest of the run: {e}")
+        shutdown_pool()
+        return [normalize(t) for t in texts]
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None